@@ -1,10 +1,20 @@
+import bisect
+import datetime
+import io
+import re
+from concurrent.futures import ThreadPoolExecutor
+import diskcache
+import requests
 import streamlit as st
 import yfinance as yf
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import feedparser
+from lxml import etree
+from indicators import calculate_metrics
 
 # ==========================================
 # 1. PAGE CONFIGURATION
@@ -19,48 +29,297 @@ st.set_page_config(
 # 2. HELPER FUNCTIONS
 # ==========================================
 
-@st.cache_data
-def convert_df(df):
+# Keywords to identify relevant financial news (compiled once per script run)
+MARKET_KEYWORDS_RE = re.compile(
+    r"business|economy|regulation|policy|growth|earnings|revenue|strategy|tech|sector|tax",
+    re.IGNORECASE
+)
+
+# Magnitude tiers for format_large_number: lower bounds, divisors and suffixes
+MAGNITUDE_BOUNDS = (1e6, 1e9, 1e12)
+MAGNITUDE_DIVISORS = (1.0, 1e6, 1e9, 1e12)
+MAGNITUDE_SUFFIXES = ("", "M", "B", "T")
+
+# Strategic Context Engine lookup tables: (status, description, color)
+# Indexed by price > SMA_50
+TREND_PHASES = (
+    ("CONTRACTION (Pressure Phase)",
+     "Asset is trading below its 50-day baseline, indicating structural headwinds.",
+     "#FF4B4B"),
+    ("EXPANSION (Growth Phase)",
+     "Asset is trading above its 50-day baseline, indicating positive structural momentum.",
+     "#09AB3B"),
+)
+# Indexed by RSI zone: < 30, 30-70, > 70
+SENTIMENT_ZONES = (
+    ("DEPRESSED / VALUE ZONE",
+     "Sentiment is historically low. May indicate over-reaction to negative news.",
+     "#09AB3B"),
+    ("STABLE / NORMALIZED",
+     "Sentiment is within standard deviation. Price movement is likely rational.",
+     "gray"),
+    ("HEATED / ELEVATED ATTENTION",
+     "Sentiment is historically stretched. Often correlates with news cycles or hype spikes.",
+     "orange"),
+)
+# Indexed by volatility > 2.5%: (status, color)
+VOLATILITY_PROFILES = (
+    ("STABLE", "gray"),
+    ("HIGH VOLATILITY", "red"),
+)
+
+@st.cache_resource
+def get_disk_cache():
+    """
+    On-disk cache shared by all sessions and kept across server restarts.
+    Sits underneath st.cache_data, which only lives as long as the process.
+    """
+    return diskcache.Cache('.cache/marketpulse', size_limit=2**30)
+
+disk_cache = get_disk_cache()
+
+@st.cache_data(ttl=900, show_spinner=False)
+def fetch_history(sym, period, day):
+    """
+    Fetches OHLCV history from Yahoo Finance.
+    `day` is part of the cache key so cached data is refreshed daily.
+    Non-empty results are also persisted to disk as Feather (Arrow) bytes.
+    """
+    key = ('history', sym, period, day)
+    blob = disk_cache.get(key)
+    if blob is not None:
+        frame = pd.read_feather(io.BytesIO(blob))
+        return frame.set_index(frame.columns[0])
+
+    hist = yf.Ticker(sym).history(period=period)
+    if not hist.empty:
+        # Feather needs a default index, so store the dates as a column
+        buf = io.BytesIO()
+        hist.reset_index().to_feather(buf)
+        disk_cache.set(key, buf.getvalue(), expire=900)
+    return hist
+
+@st.cache_data(ttl=86400, show_spinner=False)
+@disk_cache.memoize(expire=86400)
+def fetch_profile(sym):
     """
-    Converts a pandas DataFrame to a CSV string for download.
-    Using @st.cache_data prevents re-encoding on every rerun.
+    Fetches the slow-changing company profile (name, sector, beta).
+    This needs yfinance's heavy info endpoint, so it is cached once per ticker.
     """
-    return df.to_csv().encode('utf-8')
+    info = yf.Ticker(sym).get_info()
+    return {key: info[key] for key in ('longName', 'sector', 'beta') if key in info}
+
+@st.cache_data(ttl=900, show_spinner=False)
+@disk_cache.memoize(expire=900)
+def fetch_info(sym, day):
+    """
+    Fetches company metadata (sector, market cap, beta) from Yahoo Finance.
+    Market cap comes from the lightweight fast_info endpoint of a fresh
+    Ticker (FastInfo memoizes its values), the rest from the cached profile.
+    """
+    info = dict(fetch_profile(sym))
+    info['marketCap'] = yf.Ticker(sym).fast_info.get('market_cap')
+    return info
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def make_csv(sym, period, day):
+    """
+    Converts the price history to CSV bytes for download using Arrow's
+    C++ CSV writer. Keyed on (ticker, period, day) rather than the DataFrame
+    itself, so a cache hit doesn't need to hash the whole frame.
+    Note: Arrow writes whole floats without ".0" (0 rather than 0.0).
+    """
+    hist = fetch_history(sym, period, day)
+    # Dates go first as a regular column, pre-formatted the way
+    # DataFrame.to_csv wrote them (e.g. 2024-01-02 00:00:00-05:00)
+    frame = hist.reset_index()
+    frame[frame.columns[0]] = hist.index.astype(str)
+    buf = pa.BufferOutputStream()
+    # Fields are only dates and numbers, so neither header nor values need quoting
+    pacsv.write_csv(
+        pa.Table.from_pandas(frame, preserve_index=False), buf,
+        pacsv.WriteOptions(quoting_header='none', quoting_style='none')
+    )
+    return buf.getvalue().to_pybytes()
 
 def format_large_number(num):
     """
     Formats large financial numbers (Trillions, Billions, Millions) 
     into a human-readable string (e.g., $1.25T).
     """
-    if num is None:
+    if num is None or num != num:  # None or NaN
         return "N/A"
-    if num >= 1_000_000_000_000:
-        return f"${num / 1_000_000_000_000:.2f}T"
-    elif num >= 1_000_000_000:
-        return f"${num / 1_000_000_000:.2f}B"
-    elif num >= 1_000_000:
-        return f"${num / 1_000_000:.2f}M"
-    else:
-        return f"${num:,.2f}"
+    tier = bisect.bisect_right(MAGNITUDE_BOUNDS, num)
+    return f"${num / MAGNITUDE_DIVISORS[tier]:,.2f}{MAGNITUDE_SUFFIXES[tier]}"
+
+@st.cache_resource
+def _feed_validators():
+    """
+    Per-URL ETag / Last-Modified values and the last parsed entries.
+    Lives in cache_resource so it survives reruns and TTL expiry of _fetch_feed.
+    """
+    return {}
+
+@st.cache_data(ttl=600, show_spinner=False)
+@disk_cache.memoize(expire=600)
+def _fetch_feed(url):
+    """
+    Downloads an RSS feed and extracts lightweight (title, link, published) tuples.
+    Sends the previous ETag / Last-Modified so an unchanged feed comes back as a 304.
+    """
+    validators = _feed_validators()
+    prior = validators.get(url, {})
+
+    headers = {}
+    if prior.get('etag'):
+        headers['If-None-Match'] = prior['etag']
+    if prior.get('modified'):
+        headers['If-Modified-Since'] = prior['modified']
+
+    resp = requests.get(url, headers=headers, timeout=3)
+    if resp.status_code == 304:
+        return prior.get('entries', [])
+    resp.raise_for_status()
+
+    # Only title/link/pubDate are needed, so read the <item> nodes directly
+    # instead of running feedparser's full sanitization pass
+    parser = etree.XMLParser(resolve_entities=False, no_network=True)
+    root = etree.fromstring(resp.content, parser=parser)
+    entries = [
+        (
+            (item.findtext('title') or '').strip(),
+            (item.findtext('link') or '').strip(),
+            (item.findtext('pubDate') or '').strip()
+        )
+        for item in root.iterfind('.//item')
+    ]
+
+    validators[url] = {
+        'etag': resp.headers.get('ETag'),
+        'modified': resp.headers.get('Last-Modified'),
+        'entries': entries
+    }
+    return entries
+
+def lttb(x, y, n_out=500):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Returns the indices of the n_out points that best preserve the visual
+    shape of the (x, y) line; x must be numeric and y must not contain NaN.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+
+    a = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            next_start, next_end = edges[b + 1], edges[b + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Pick the point forming the largest triangle with the previous pick and the next bucket's average
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        idx[b + 1] = a
 
-def calculate_metrics(data, window=14):
+    return idx
+
+@st.cache_resource(ttl=900, max_entries=32, show_spinner=False)
+def build_chart(sym, period, day):
     """
-    Calculates Technical Indicators:
-    1. RSI (Relative Strength Index) for momentum/sentiment.
-    2. Volatility (Standard Deviation of returns).
+    Builds the Price/Trend + RSI figure for a ticker.
+    Cached per (ticker, period, day) so reruns reuse the finished figure
+    instead of re-running indicators, downsampling and trace validation.
     """
-    # RSI Calculation
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
+    hist = fetch_history(sym, period, day)
+    hist['RSI'], hist['Volatility'], hist['SMA_50'] = calculate_metrics(hist['Close'].to_numpy())
+
+    # Plot inputs as float32 arrays: half the bytes of float64 once Plotly
+    # encodes them, with no visible difference on a price chart
+    chart_index = hist.index
+    if chart_index.tz is not None:
+        chart_index = chart_index.tz_localize(None)  # keep exchange-local dates
+    x = chart_index.values.astype('datetime64[ms]')
+    o = hist['Open'].to_numpy(dtype=np.float32)
+    h = hist['High'].to_numpy(dtype=np.float32)
+    l = hist['Low'].to_numpy(dtype=np.float32)
+    c = hist['Close'].to_numpy(dtype=np.float32)
+    sma = hist['SMA_50'].to_numpy(dtype=np.float32)
+    rsi = hist['RSI'].to_numpy(dtype=np.float32)
+
+    # Downsample the trend/sentiment overlays on long horizons; candles stay raw
+    x_num = x.astype(np.int64)
+    sma_idx = np.flatnonzero(~np.isnan(sma))
+    rsi_idx = np.flatnonzero(~np.isnan(rsi))
+    if len(hist) > 500:
+        sma_idx = sma_idx[lttb(x_num[sma_idx], sma[sma_idx])]
+        rsi_idx = rsi_idx[lttb(x_num[rsi_idx], rsi[rsi_idx])]
+
+    # Create Dual-Axis Chart: Price (Row 1) and RSI (Row 2)
+    fig = make_subplots(
+        rows=2, cols=1, 
+        shared_xaxes=True, 
+        vertical_spacing=0.1, 
+        subplot_titles=(f'{sym} Price vs Trend', 'Sentiment Index (RSI)'), 
+        row_heights=[0.7, 0.3]
+    )
+
+    # Row 1: Candlestick Price Chart
+    fig.add_trace(go.Candlestick(
+        x=x,
+        open=o, high=h,
+        low=l, close=c,
+        name='Price'
+    ), row=1, col=1)
     
-    # Volatility Calculation (Std Dev of % returns)
-    returns = data['Close'].pct_change()
-    volatility = returns.rolling(window=14).std() * 100 
+    # Row 1: 50-Day SMA Overlay
+    fig.add_trace(go.Scatter(
+        x=x[sma_idx], y=sma[sma_idx], 
+        line=dict(color='orange', width=2), 
+        name='50-Day Trend'
+    ), row=1, col=1)
+
+    # Row 2: RSI Line
+    fig.add_trace(go.Scatter(
+        x=x[rsi_idx], y=rsi[rsi_idx], 
+        line=dict(color='#636EFA', width=2), 
+        name='RSI Sentiment'
+    ), row=2, col=1)
+    
+    # Row 2: RSI Reference Lines (70 and 30)
+    fig.add_hline(y=70, line_dash="dot", line_color="red", row=2, col=1, annotation_text="Heated (70)")
+    fig.add_hline(y=30, line_dash="dot", line_color="green", row=2, col=1, annotation_text="Value (30)")
+
+    # Chart Layout Configuration
+    fig.update_layout(
+        height=700,
+        xaxis_rangeslider_visible=False,  # Hide default slider to save space
+        showlegend=True,
+        legend=dict(orientation="h", y=1.02, xanchor="right", x=1),
+        template="plotly_white",
+        margin=dict(l=20, r=20, t=50, b=20)
+    )
     
-    return rsi, volatility
+    # Lock RSI Y-Axis to 0-100 standard scale
+    fig.update_yaxes(range=[0, 100], row=2, col=1)
+
+    return fig
 
 def get_market_news(ticker_filter=None):
     """
@@ -69,28 +328,27 @@ def get_market_news(ticker_filter=None):
     """
     try:
         rss_url = "https://www.cnbc.com/id/15839069/device/rss/rss.html"
-        feed = feedparser.parse(rss_url)
-        
-        # Keywords to identify relevant financial news
-        market_keywords = [
-            "business", "economy", "regulation", "policy", "growth", 
-            "earnings", "revenue", "strategy", "tech", "sector", "tax"
-        ]
+        entries = _fetch_feed(rss_url)
+
+        keyword_re = MARKET_KEYWORDS_RE
         if ticker_filter:
-            market_keywords.append(ticker_filter.lower())
+            keyword_re = re.compile(
+                MARKET_KEYWORDS_RE.pattern + '|' + re.escape(ticker_filter), re.IGNORECASE
+            )
         
         filtered_news = []
-        for entry in feed.entries:
-            title_lower = entry.title.lower()
+        for title, link, published in entries:
             # Check if title contains any of our target keywords
-            if any(keyword in title_lower for keyword in market_keywords):
+            if keyword_re.search(title):
                 filtered_news.append({
-                    "title": entry.title,
-                    "link": entry.link,
-                    "published": entry.published,
+                    "title": title,
+                    "link": link,
+                    "published": published,
                     "source": "CNBC"
                 })
-        return filtered_news[:5]  # Return top 5 matches
+                if len(filtered_news) == 5:  # Return top 5 matches
+                    break
+        return filtered_news
     except Exception:
         return []
 
@@ -144,15 +402,19 @@ time_period = st.sidebar.selectbox(
 # ==========================================
 
 st.title(f"🏛 {ticker_symbol} Strategic Overview")
-ticker = yf.Ticker(ticker_symbol)
+today = datetime.date.today().isoformat()
 
 try:
     # --- Data Fetching ---
-    hist = ticker.history(period=time_period)
+    # History and metadata are independent HTTP calls, so overlap them
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        hist_future = pool.submit(fetch_history, ticker_symbol, time_period, today)
+        info_future = pool.submit(fetch_info, ticker_symbol, today)
+    hist = hist_future.result()
     
     # 1. ETL Pipeline: Enable CSV Download if data exists
     if not hist.empty:
-        csv_data = convert_df(hist)
+        csv_data = make_csv(ticker_symbol, time_period, today)
         st.sidebar.markdown("---")
         st.sidebar.download_button(
             label="📥 Download Data (CSV)",
@@ -164,7 +426,7 @@ try:
 
     # 2. Metadata Extraction (Sector, Market Cap, Beta)
     try:
-        info = ticker.info 
+        info = info_future.result()
         sector = info.get('sector', 'Diversified')
         market_cap_raw = info.get('marketCap')
         long_name = info.get('longName', ticker_symbol)
@@ -185,15 +447,16 @@ if not hist.empty:
     st.caption(f"{long_name} | Sector: {sector}")
     
     # A. Calculate Technical Metrics
-    hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
-    hist['RSI'], hist['Volatility'] = calculate_metrics(hist)
+    close_arr = hist['Close'].to_numpy()
+    rsi_arr, vol_arr, sma_arr = calculate_metrics(close_arr)
+    hist['RSI'], hist['Volatility'], hist['SMA_50'] = rsi_arr, vol_arr, sma_arr
     
-    # Get latest values for display
-    current_price = hist['Close'].iloc[-1]
-    pct_change = ((current_price - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
-    sma_50 = hist['SMA_50'].iloc[-1]
-    rsi_val = hist['RSI'].iloc[-1]
-    vol_val = hist['Volatility'].iloc[-1]
+    # Get latest values for display (read straight from the numpy arrays)
+    current_price = close_arr[-1]
+    pct_change = ((current_price - close_arr[-2]) / close_arr[-2]) * 100
+    sma_50 = sma_arr[-1]
+    rsi_val = rsi_arr[-1]
+    vol_val = vol_arr[-1]
 
     # B. Display Top-Level Metrics
     c1, c2, c3, c4 = st.columns(4)
@@ -214,38 +477,15 @@ if not hist.empty:
     else:
         # --- Logic 1: Structural Trend (Expansion vs Contraction) ---
         # Checks if price is above/below the 50-Day Moving Average
-        if current_price > sma_50:
-            trend_status = "EXPANSION (Growth Phase)"
-            trend_desc = "Asset is trading above its 50-day baseline, indicating positive structural momentum."
-            trend_color = "#09AB3B"
-        else:
-            trend_status = "CONTRACTION (Pressure Phase)"
-            trend_desc = "Asset is trading below its 50-day baseline, indicating structural headwinds."
-            trend_color = "#FF4B4B"
+        trend_status, trend_desc, trend_color = TREND_PHASES[int(current_price > sma_50)]
 
         # --- Logic 2: Market Sentiment (RSI Zones) ---
         # Checks if asset is Overbought (>70) or Oversold (<30)
-        if rsi_val > 70:
-            sent_status = "HEATED / ELEVATED ATTENTION"
-            sent_desc = "Sentiment is historically stretched. Often correlates with news cycles or hype spikes."
-            sent_color = "orange"
-        elif rsi_val < 30:
-            sent_status = "DEPRESSED / VALUE ZONE"
-            sent_desc = "Sentiment is historically low. May indicate over-reaction to negative news."
-            sent_color = "#09AB3B" 
-        else:
-            sent_status = "STABLE / NORMALIZED"
-            sent_desc = "Sentiment is within standard deviation. Price movement is likely rational."
-            sent_color = "gray"
+        sent_status, sent_desc, sent_color = SENTIMENT_ZONES[1 + int(rsi_val > 70) - int(rsi_val < 30)]
 
         # --- Logic 3: Volatility Profile ---
         # Checks if volatility exceeds 2.5% threshold
-        if vol_val > 2.5:
-            risk_status = "HIGH VOLATILITY"
-            risk_color = "red"
-        else:
-            risk_status = "STABLE"
-            risk_color = "gray"
+        risk_status, risk_color = VOLATILITY_PROFILES[int(vol_val > 2.5)]
 
         # Display Context Cards
         col_a, col_b, col_c = st.columns(3)
@@ -265,55 +505,7 @@ if not hist.empty:
     # 6. VISUALIZATION (PLOTLY)
     # ==========================================
     
-    # Create Dual-Axis Chart: Price (Row 1) and RSI (Row 2)
-    fig = make_subplots(
-        rows=2, cols=1, 
-        shared_xaxes=True, 
-        vertical_spacing=0.1, 
-        subplot_titles=(f'{ticker_symbol} Price vs Trend', 'Sentiment Index (RSI)'), 
-        row_heights=[0.7, 0.3]
-    )
-
-    # Row 1: Candlestick Price Chart
-    fig.add_trace(go.Candlestick(
-        x=hist.index,
-        open=hist['Open'], high=hist['High'],
-        low=hist['Low'], close=hist['Close'],
-        name='Price'
-    ), row=1, col=1)
-    
-    # Row 1: 50-Day SMA Overlay
-    fig.add_trace(go.Scatter(
-        x=hist.index, y=hist['SMA_50'], 
-        line=dict(color='orange', width=2), 
-        name='50-Day Trend'
-    ), row=1, col=1)
-
-    # Row 2: RSI Line
-    fig.add_trace(go.Scatter(
-        x=hist.index, y=hist['RSI'], 
-        line=dict(color='#636EFA', width=2), 
-        name='RSI Sentiment'
-    ), row=2, col=1)
-    
-    # Row 2: RSI Reference Lines (70 and 30)
-    fig.add_hline(y=70, line_dash="dot", line_color="red", row=2, col=1, annotation_text="Heated (70)")
-    fig.add_hline(y=30, line_dash="dot", line_color="green", row=2, col=1, annotation_text="Value (30)")
-
-    # Chart Layout Configuration
-    fig.update_layout(
-        height=700,
-        xaxis_rangeslider_visible=False,  # Hide default slider to save space
-        showlegend=True,
-        legend=dict(orientation="h", y=1.02, xanchor="right", x=1),
-        template="plotly_white",
-        margin=dict(l=20, r=20, t=50, b=20)
-    )
-    
-    # Lock RSI Y-Axis to 0-100 standard scale
-    fig.update_yaxes(range=[0, 100], row=2, col=1)
-
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_chart(ticker_symbol, time_period, today), use_container_width=True)
 
     # ==========================================
     # 7. NEWS FEED INTEGRATION
@@ -0,0 +1,110 @@
+"""
+Technical indicator math for MarketPulse.
+
+Kept out of the Streamlit script on purpose: Streamlit re-executes the script
+on every rerun, which would rebuild the Numba dispatcher (and reload its
+compiled code) each time. As an imported module it is compiled once and stays
+in sys.modules for the life of the server.
+"""
+import numpy as np
+from numba import njit
+
+
+# Fast-math without 'nnan' / 'ninf': missing prices arrive as NaN and the
+# kernel has to be able to see them
+FASTMATH_FLAGS = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+@njit(cache=True, fastmath=FASTMATH_FLAGS)
+def _indicator_kernel(close, gain, loss, rets, w, trend_w):
+    """
+    Single-pass RSI / volatility / SMA kernel.
+    Keeps running gain/loss sums, a running sum / sum-of-squares of returns
+    and a running sum of prices, so each step is O(1) instead of re-averaging
+    the whole window. Non-finite prices and returns are counted instead of
+    summed, and a window only yields a value once none are left in it,
+    matching pandas' rolling() with the default min_periods.
+    """
+    n = close.shape[0]
+    rsi = np.full(n, np.nan)
+    vol = np.full(n, np.nan)
+    sma = np.full(n, np.nan)
+
+    gain_sum = 0.0
+    loss_sum = 0.0
+    ret_sum = 0.0
+    ret_sq = 0.0
+    ret_missing = 0
+    price_sum = 0.0
+    price_missing = 0
+    for i in range(n):
+        # Trend baseline: simple moving average of the last trend_w prices
+        if np.isfinite(close[i]):
+            price_sum += close[i]
+        else:
+            price_missing += 1
+        if i >= trend_w:
+            old_price = close[i - trend_w]
+            if np.isfinite(old_price):
+                price_sum -= old_price
+            else:
+                price_missing -= 1
+        if i >= trend_w - 1 and price_missing == 0:
+            sma[i] = price_sum / trend_w
+
+        # RSI: gains/losses arrive with missing deltas already zeroed
+        gain_sum += gain[i]
+        loss_sum += loss[i]
+        if i >= w:
+            gain_sum -= gain[i - w]
+            loss_sum -= loss[i - w]
+        if i >= w - 1:
+            if loss_sum > 0:
+                rsi[i] = 100.0 - 100.0 / (1.0 + gain_sum / loss_sum)
+            elif gain_sum > 0:
+                rsi[i] = 100.0
+
+        # Volatility: sample std of the last w returns
+        if np.isfinite(rets[i]):
+            ret_sum += rets[i]
+            ret_sq += rets[i] * rets[i]
+        else:
+            ret_missing += 1
+        if i >= w:
+            old_ret = rets[i - w]
+            if np.isfinite(old_ret):
+                ret_sum -= old_ret
+                ret_sq -= old_ret * old_ret
+            else:
+                ret_missing -= 1
+        if i >= w - 1 and ret_missing == 0:
+            var = (ret_sq - ret_sum * ret_sum / w) / (w - 1)
+            vol[i] = np.sqrt(max(var, 0.0)) * 100.0
+
+    return rsi, vol, sma
+
+
+def calculate_metrics(close, window=14, trend_window=50):
+    """
+    Calculates Technical Indicators from an array of closing prices:
+    1. RSI (Relative Strength Index) for momentum/sentiment.
+    2. Volatility (Standard Deviation of returns).
+    3. SMA (Simple Moving Average) as the structural trend baseline.
+    Returns three numpy arrays aligned with `close`.
+    """
+    close = np.asarray(close, dtype=np.float64)
+
+    # Element-wise deltas and returns are vectorized in numpy up front,
+    # leaving only the sliding-window sums for the sequential kernel
+    delta = np.empty_like(close)
+    rets = np.empty_like(close)
+    delta[:1] = np.nan
+    rets[:1] = np.nan
+    np.subtract(close[1:], close[:-1], out=delta[1:])
+    np.divide(delta[1:], close[:-1], out=rets[1:])
+
+    # fmax treats a missing delta (including the first one) as no move
+    gain = np.fmax(delta, 0.0)
+    loss = np.fmax(-delta, 0.0)
+
+    return _indicator_kernel(close, gain, loss, rets, window, trend_window)